@@ -334,7 +334,7 @@ class SingleServerIRCBot(irc.client.SimpleIRCClient):
                 connection.ctcp_reply(nick, "PING " + event.arguments[1])
         elif (
             event.arguments[0] == "DCC"
-            and event.arguments[1].split(" ", 1)[0] == "CHAT"
+            and event.arguments[1].partition(" ")[0] == "CHAT"
         ):
             self.on_dccchat(connection, event)
 
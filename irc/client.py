@@ -53,16 +53,16 @@ import bisect
 import collections
 import contextlib
 import functools
-import itertools
+import heapq
 import logging
-import re
-import select
+import selectors
 import socket
 import struct
+import sys
 import threading
 import time
 import warnings
-from typing import Callable
+from typing import Callable, ClassVar
 
 import jaraco.functools
 from jaraco.functools import Throttler
@@ -125,6 +125,9 @@ class ServerConnection(Connection):
     buffer_class = buffer.DecodingLineBuffer
     socket = None
     connected = False
+    _write_buf = None
+    _write_limit = None
+    _rate_limited = False
 
     def __init__(self, reactor):
         super().__init__(reactor)
@@ -188,6 +191,11 @@ class ServerConnection(Connection):
             self.socket = self.connect_factory(self.server_address)
         except OSError as ex:
             raise ServerConnectionError(f"Couldn't connect to socket: {ex}") from ex
+        # SSL and other file-like connections provide write; plain
+        # sockets may accept only part of a line from send.
+        self._sender = getattr(self.socket, 'write', self.socket.sendall)
+        if self._write_buf is not None:
+            self._write_buf = bytearray()
         self.connected = True
         self.reactor._on_connect(self.socket)
 
@@ -327,84 +335,116 @@ class ServerConnection(Connection):
         self.buffer.feed(new_data)
 
         # process each non-empty line after logging all lines
+        debug = log.isEnabledFor(logging.DEBUG)
         for line in self.buffer:
-            log.debug("FROM SERVER: %s", line)
+            if debug:
+                log.debug("FROM SERVER: %s", line)
             if not line:
                 continue
             self._process_line(line)
 
     def _process_line(self, line):
-        event = Event("all_raw_messages", self.get_server_name(), None, [line])
-        self._handle_event(event)
+        if self._wants_raw_messages():
+            event = Event("all_raw_messages", self.get_server_name(), None, [line])
+            self._handle_event(event)
 
-        grp = _rfc_1459_command_regexp.match(line).group
+        raw_tags, prefix, raw_command, argument = _parse_line(line)
 
-        source = NickMask.from_group(grp("prefix"))
-        command = events.Command.lookup(grp("command"))
-        arguments = message.Arguments.from_group(grp('argument'))
-        tags = message.Tag.from_group(grp('tags'))
+        source = NickMask.from_group(prefix)
+        command = events.Command.lookup(raw_command)
+        arguments = message.Arguments.from_group(argument)
+        tags = message.Tag.from_group(raw_tags)
 
         if source and not self.real_server_name:
             self.real_server_name = source
 
-        if command == "nick":
-            if source.nick == self.real_nickname:
-                self.real_nickname = arguments[0]
-        elif command == "welcome":
-            # Record the nickname in case the client changed nick
-            # in a nicknameinuse callback.
-            self.real_nickname = arguments[0]
-        elif command == "featurelist":
-            self.features.load(arguments)
+        track = self._trackers.get(command)
+        if track is not None:
+            track(self, source, arguments)
 
         handler = (
             self._handle_message
-            if command in ["privmsg", "notice"]
+            if command in ("privmsg", "notice")
             else self._handle_other
         )
         handler(arguments, command, source, tags)
 
+    def _wants_raw_messages(self):
+        """
+        Is anything listening for all_raw_messages, either directly
+        or through all_events? Most clients are not, so the event is
+        only built for those that are.
+        """
+        return bool(
+            self.reactor._handlers_for("all_raw_messages")
+            or "all_raw_messages" in self.handlers
+        )
+
+    def _track_nick(self, source, arguments):
+        if source.nick == self.real_nickname:
+            self.real_nickname = arguments[0]
+
+    def _track_welcome(self, source, arguments):
+        # Record the nickname in case the client changed nick
+        # in a nicknameinuse callback.
+        self.real_nickname = arguments[0]
+
+    def _track_featurelist(self, source, arguments):
+        self.features.load(arguments)
+
+    _trackers: ClassVar[dict[str, Callable]] = {
+        "nick": _track_nick,
+        "welcome": _track_welcome,
+        "featurelist": _track_featurelist,
+    }
+    """
+    Commands that update the connection's own state before the
+    event is dispatched, looked up in one step rather than through
+    a chain of comparisons for every line.
+    """
+
     def _handle_message(self, arguments, command, source, tags):
         target, msg = arguments[:2]
         messages = ctcp.dequote(msg)
+        to_channel = is_channel(target)
         if command == "privmsg":
-            if is_channel(target):
+            if to_channel:
                 command = "pubmsg"
         else:
-            if is_channel(target):
-                command = "pubnotice"
-            else:
-                command = "privnotice"
+            command = "pubnotice" if to_channel else "privnotice"
+        debug = log.isEnabledFor(logging.DEBUG)
         for m in messages:
             if isinstance(m, tuple):
-                if command in ["privmsg", "pubmsg"]:
+                if command in ("privmsg", "pubmsg"):
                     command = "ctcp"
                 else:
                     command = "ctcpreply"
 
                 m = list(m)
-                log.debug(
-                    "command: %s, source: %s, target: %s, arguments: %s, tags: %s",
-                    command,
-                    source,
-                    target,
-                    m,
-                    tags,
-                )
+                if debug:
+                    log.debug(
+                        "command: %s, source: %s, target: %s, arguments: %s, tags: %s",
+                        command,
+                        source,
+                        target,
+                        m,
+                        tags,
+                    )
                 event = Event(command, source, target, m, tags)
                 self._handle_event(event)
                 if command == "ctcp" and m[0] == "ACTION":
                     event = Event("action", source, target, m[1:], tags)
                     self._handle_event(event)
             else:
-                log.debug(
-                    "command: %s, source: %s, target: %s, arguments: %s, tags: %s",
-                    command,
-                    source,
-                    target,
-                    [m],
-                    tags,
-                )
+                if debug:
+                    log.debug(
+                        "command: %s, source: %s, target: %s, arguments: %s, tags: %s",
+                        command,
+                        source,
+                        target,
+                        [m],
+                        tags,
+                    )
                 event = Event(command, source, target, [m], tags)
                 self._handle_event(event)
 
@@ -420,14 +460,15 @@ class ServerConnection(Connection):
         if command == "mode":
             if not is_channel(target):
                 command = "umode"
-        log.debug(
-            "command: %s, source: %s, target: %s, arguments: %s, tags: %s",
-            command,
-            source,
-            target,
-            arguments,
-            tags,
-        )
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                "command: %s, source: %s, target: %s, arguments: %s, tags: %s",
+                command,
+                source,
+                target,
+                arguments,
+                tags,
+            )
         event = Event(command, source, target, arguments, tags)
         self._handle_event(event)
 
@@ -508,10 +549,8 @@ class ServerConnection(Connection):
     def ctcp(self, ctcptype, target, parameter=""):
         """Send a CTCP command."""
         ctcptype = ctcptype.upper()
-        self.privmsg(
-            target,
-            f"\001{ctcptype} {parameter}\001" if parameter else "\001{ctcptype}\001",
-        )
+        tag = f"{ctcptype} {parameter}" if parameter else ctcptype
+        self.privmsg(target, f"\001{tag}\001")
 
     def ctcp_reply(self, target, parameter):
         """Send a CTCP REPLY command."""
@@ -524,12 +563,12 @@ class ServerConnection(Connection):
 
             message -- Quit message.
         """
-        try:
-            del self.connected
-        except AttributeError:
+        if not self.connected:
             return
+        self.connected = False
 
         self.quit(message)
+        self.flush()
 
         try:
             self.socket.shutdown(socket.SHUT_WR)
@@ -538,7 +577,7 @@ class ServerConnection(Connection):
 
         self.socket.close()
 
-        del self.socket
+        self.socket = None
         self._handle_event(Event("disconnect", self.server, "", [message]))
 
     def globops(self, text):
@@ -560,7 +599,7 @@ class ServerConnection(Connection):
 
             nicks -- List of nicks.
         """
-        self.send_items('ISON', *tuple(nicks))
+        self.send_items('ISON', *nicks)
 
     def join(self, channel, key=""):
         """Send a JOIN command."""
@@ -628,9 +667,25 @@ class ServerConnection(Connection):
         self.send_items('PRIVMSG', target, ':' + text)
 
     def privmsg_many(self, targets, text):
-        """Send a PRIVMSG command to multiple targets."""
-        target = ','.join(targets)
-        return self.privmsg(target, text)
+        """
+        Send a PRIVMSG command to multiple targets, split over as
+        many messages as needed to keep each within the length limit.
+        """
+        budget = 512 - len(self._prep_message(f'PRIVMSG  :{text}'))
+        # plan every batch first, so that nothing is sent if any
+        # target can't fit
+        batches, size = [], budget
+        for target in targets:
+            length = len(self.encode(target))
+            if length > budget:
+                raise MessageTooLong("Messages limited to 512 bytes including CR/LF")
+            if size + 1 + length > budget:
+                batches.append([])
+                size = -1
+            batches[-1].append(target)
+            size += 1 + length
+        for batch in batches:
+            self.privmsg(','.join(batch), text)
 
     def quit(self, message=""):
         """Send a QUIT command."""
@@ -665,14 +720,39 @@ class ServerConnection(Connection):
         """
         if self.socket is None:
             raise ServerNotConnectedError("Not connected.")
-        sender = getattr(self.socket, 'write', self.socket.send)
+        if self._write_buf is not None:
+            message = self._prep_message(string)
+            with self.reactor.mutex:
+                self._write_buf += message
+                log.debug("TO SERVER (queued): %s", string)
+                if self._rate_limited or (
+                    self._write_limit and len(self._write_buf) >= self._write_limit
+                ):
+                    self.flush()
+            return
         try:
-            sender(self._prep_message(string))
+            self._sender(self._prep_message(string))
             log.debug("TO SERVER: %s", string)
         except OSError:
             # Ouch!
             self.disconnect("Connection reset by peer.")
 
+    def _flush_writes(self):
+        """
+        Send as much of the write buffer as the socket will take,
+        keeping the remainder for the next time it is writable.
+        """
+        with self.reactor.mutex:
+            if not self._write_buf:
+                return
+            # send a copy; the buffer can't be resized while exported
+            try:
+                sent = self.socket.send(bytes(self._write_buf))
+            except OSError:
+                self.disconnect("Connection reset by peer.")
+                return
+            del self._write_buf[:sent]
+
     def squit(self, server, comment=""):
         """Send an SQUIT command."""
         self.send_items('SQUIT', server, comment and ':' + comment)
@@ -686,8 +766,15 @@ class ServerConnection(Connection):
         self.send_items('TIME', server)
 
     def topic(self, channel, new_topic=None):
-        """Send a TOPIC command."""
-        self.send_items('TOPIC', channel, new_topic and ':' + new_topic)
+        """Send a TOPIC command.
+
+        With `new_topic` None, query the topic; an empty string
+        clears it.
+        """
+        if new_topic is None:
+            self.send_items('TOPIC', channel)
+        else:
+            self.send_items('TOPIC', channel, ':' + new_topic)
 
     def trace(self, target=""):
         """Send a TRACE command."""
@@ -726,12 +813,62 @@ class ServerConnection(Connection):
         """Send a WHOWAS command."""
         self.send_items('WHOWAS', nick, max, server)
 
-    def set_rate_limit(self, frequency):
+    def set_rate_limit(self, frequency, burst=1):
         """
         Set a `frequency` limit (messages per second) for this connection.
         Any attempts to send faster than this rate will block.
+
+        Up to `burst` messages may be sent back to back after an idle
+        period (as most servers' flood protection allows) before the
+        limit applies.
+
+        With the write buffer on, each message is flushed as soon as
+        the limit lets it through, so the server sees the paced rate
+        rather than one burst when the reactor drains the buffer.
+        """
+        self._rate_limited = True
+        self.send_raw = _TokenBucket(self.send_raw, frequency, burst)
+
+    def set_write_buffer(self, enabled=True, limit=None):
+        """
+        Queue outgoing messages instead of sending each one as it is
+        issued. The reactor sends whatever has accumulated in as few
+        calls as possible once the socket is writable, so bursts of
+        commands cost one system call rather than one per message.
+
+        Off by default. When on, the connection must be serviced by
+        Reactor.process_once (or process_forever) for messages to go out,
+        or flushed explicitly with flush(). A rate limit set with
+        set_rate_limit takes precedence: each message is then flushed
+        once the limit releases it.
+
+        If `limit` is given, the buffer is also flushed as soon as it
+        holds at least that many bytes, bounding both its size and how
+        long a large burst waits on the reactor.
+        """
+        with self.reactor.mutex:
+            self._write_limit = limit
+            if not enabled:
+                self.flush()
+                self._write_buf = None
+            elif self._write_buf is None:
+                self._write_buf = bytearray()
+
+    def flush(self):
+        """
+        Send any messages queued by the write buffer right away,
+        for when a reply must not wait on the reactor (e.g. during
+        authentication).
         """
-        self.send_raw = Throttler(self.send_raw, frequency)
+        with self.reactor.mutex:
+            if not self._write_buf or self.socket is None:
+                return
+            pending = bytes(self._write_buf)
+            del self._write_buf[: len(pending)]
+            try:
+                self.socket.sendall(pending)
+            except OSError:
+                self.disconnect("Connection reset by peer.")
 
     def set_keepalive(self, interval):
         """
@@ -743,6 +880,34 @@ class ServerConnection(Connection):
         self.reactor.scheduler.execute_every(period=interval, func=pinger)
 
 
+class _TokenBucket(Throttler):
+    """
+    A Throttler that lets up to `burst` calls through without delay,
+    earning credit for more at `max_rate` per second, and measuring
+    time on the monotonic clock so that wall clock adjustments don't
+    stall or release sends.
+    """
+
+    def __init__(self, func, max_rate=float('Inf'), burst=1):
+        self.burst = burst
+        super().__init__(func, max_rate)
+
+    def reset(self):
+        self.tokens = self.burst
+        self.last_called = time.monotonic()
+
+    def _wait(self):
+        now = time.monotonic()
+        earned = (now - self.last_called) * self.max_rate
+        self.tokens = min(self.burst, self.tokens + earned)
+        if self.tokens < 1:
+            time.sleep((1 - self.tokens) / self.max_rate)
+            self.tokens = 1
+            now = time.monotonic()
+        self.tokens -= 1
+        self.last_called = now
+
+
 class PrioritizedHandler(collections.namedtuple('Base', ('priority', 'callback'))):
     def __lt__(self, other):
         "when sorting prioritized handlers, only use the priority"
@@ -798,6 +963,12 @@ class Reactor:
     scheduler_class = schedule.DefaultScheduler
     connection_class = ServerConnection
 
+    # Internal state created on first use, so that subclasses which
+    # don't call Reactor.__init__ keep working.
+    _merged_handlers = None
+    _selector = None
+    _selected = None
+
     def __do_nothing(*args, **kwargs):
         pass
 
@@ -851,10 +1022,23 @@ class Reactor:
         """
         with self.mutex:
             log.log(logging.DEBUG - 2, "process_data()")
-            for sock, conn in itertools.product(sockets, self.connections):
-                if sock == conn.socket:
+            by_socket = {conn.socket: conn for conn in self.connections}
+            for sock in sockets:
+                conn = by_socket.get(sock)
+                if conn is not None:
                     conn.process_data()
 
+    def _process_writes(self, sockets):
+        """
+        Flush queued output for connections whose sockets are writable.
+        """
+        with self.mutex:
+            by_socket = {conn.socket: conn for conn in self.connections}
+            for sock in sockets:
+                conn = by_socket.get(sock)
+                if conn is not None:
+                    conn._flush_writes()
+
     def process_timeout(self):
         """Called when a timeout notification is due.
 
@@ -886,13 +1070,45 @@ class Reactor:
         """
         log.log(logging.DEBUG - 2, "process_once()")
         sockets = self.sockets
+        self._register_sockets(sockets)
         if sockets:
-            in_, out, err = select.select(sockets, [], [], timeout)
-            self.process_data(in_)
+            ready = self._selector.select(timeout)
+            self.process_data([
+                key.fileobj for key, mask in ready if mask & selectors.EVENT_READ
+            ])
+            self._process_writes([
+                key.fileobj for key, mask in ready if mask & selectors.EVENT_WRITE
+            ])
         else:
             time.sleep(timeout)
         self.process_timeout()
 
+    def _register_sockets(self, sockets):
+        """
+        Bring the selector in line with `sockets`.
+
+        Sockets remain registered between calls, so only those that
+        came or went since the last call need to be (un)registered.
+        Write interest is only requested while a connection has
+        queued output, to avoid waking up for an idle socket.
+        """
+        with self.mutex:
+            if self._selector is None:
+                self._selector = selectors.DefaultSelector()
+                self._selected = {}
+            wanted = dict.fromkeys(sockets, selectors.EVENT_READ)
+            for conn in self.connections:
+                if conn.socket in wanted and getattr(conn, '_write_buf', None):
+                    wanted[conn.socket] |= selectors.EVENT_WRITE
+            for sock in self._selected.keys() - wanted.keys():
+                self._selector.unregister(sock)
+            for sock, events in wanted.items():
+                if sock not in self._selected:
+                    self._selector.register(sock, events)
+                elif self._selected[sock] != events:
+                    self._selector.modify(sock, events)
+            self._selected = wanted
+
     def process_forever(self, timeout=0.2):
         """Run an infinite loop, processing data from connections.
 
@@ -938,8 +1154,10 @@ class Reactor:
         """
         handler = PrioritizedHandler(priority, handler)
         with self.mutex:
-            event_handlers = self.handlers.setdefault(event, [])
+            event_handlers = list(self.handlers.get(event, ()))
             bisect.insort(event_handlers, handler)
+            self.handlers[event] = event_handlers
+            self._merged_handlers = {}
 
     def remove_global_handler(self, event, handler):
         """Removes a global handler function.
@@ -954,9 +1172,10 @@ class Reactor:
         with self.mutex:
             if event not in self.handlers:
                 return 0
-            for h in self.handlers[event]:
-                if handler == h.callback:
-                    self.handlers[event].remove(h)
+            self.handlers[event] = [
+                h for h in self.handlers[event] if h.callback != handler
+            ]
+            self._merged_handlers = {}
         return 1
 
     def dcc(self, dcctype="chat"):
@@ -978,15 +1197,42 @@ class Reactor:
         """
         Handle an Event event incoming on ServerConnection connection.
         """
+        handlers = self._handlers_for(event.type)
         with self.mutex:
-            matching_handlers = sorted(
-                self.handlers.get("all_events", []) + self.handlers.get(event.type, [])
-            )
-            for handler in matching_handlers:
+            for handler in handlers:
                 result = handler.callback(connection, event)
                 if result == "NO MORE":
                     return
 
+    def _handlers_for(self, event_type):
+        """
+        Return the handlers for `event_type`, along with those for
+        "all_events", in priority order.
+
+        Both lists are kept sorted, so they are merged rather than
+        sorted, and the result is cached until a handler is added or
+        removed.
+
+        Needs no lock: add/remove_global_handler replace the handler
+        lists and the cache rather than changing them in place, so a
+        merge racing with them lands in a cache that is thrown away.
+        """
+        cache = self._merged_handlers
+        if cache is None:
+            cache = self._merged_handlers = {}
+        try:
+            return cache[event_type]
+        except KeyError:
+            pass
+        merged = tuple(
+            heapq.merge(
+                self.handlers.get("all_events", ()),
+                self.handlers.get(event_type, ()),
+            )
+        )
+        cache[event_type] = merged
+        return merged
+
     def _remove_connection(self, connection):
         """[Internal]"""
         with self.mutex:
@@ -994,17 +1240,60 @@ class Reactor:
             self._on_disconnect(connection.socket)
 
 
-_cmd_pat = (
-    "^(@(?P<tags>[^ ]*) )?(:(?P<prefix>[^ ]+) +)?"
-    "(?P<command>[^ ]+)( *(?P<argument> .+))?"
-)
-_rfc_1459_command_regexp = re.compile(_cmd_pat)
+def _parse_line(line):
+    """
+    Split a line received from the server into its tags, prefix,
+    command, and argument parts (any of which but the command may
+    be None). The argument retains its leading space, as expected
+    by message.Arguments.from_group.
+
+    >>> _parse_line('PING :irc.example.com')
+    (None, None, 'PING', ' :irc.example.com')
+    >>> _parse_line(':nick!user@host  PRIVMSG #chan :hello there')
+    (None, 'nick!user@host', 'PRIVMSG', ' #chan :hello there')
+    >>> _parse_line('@a=b;c :server 001 nick :Welcome')
+    ('a=b;c', 'server', '001', ' nick :Welcome')
+    >>> _parse_line('@a=b  :server  PING :x')
+    ('a=b', 'server', 'PING', ' :x')
+    >>> _parse_line('GLOBALUSERSTATE')
+    (None, None, 'GLOBALUSERSTATE', None)
+    """
+    tags = prefix = None
+    if line.startswith('@'):
+        tags, _, line = line[1:].partition(' ')
+        line = line.lstrip(' ')
+    if line.startswith(':'):
+        prefix, _, line = line[1:].partition(' ')
+        line = line.lstrip(' ')
+    command, _, argument = line.partition(' ')
+    argument = argument.lstrip(' ')
+    return tags, prefix or None, command, ' ' + argument if argument else None
 
 
 class DCCConnectionError(IRCError):
     pass
 
 
+@functools.cache
+def _local_address():
+    """
+    Resolve the address of the local host once; the lookup
+    may block on DNS, so avoid repeating it for every DCC listen.
+    """
+    return socket.gethostbyname(socket.gethostname())
+
+
+@functools.lru_cache(maxsize=256)
+def _resolve(host):
+    """
+    Resolve a DCC peer to an IPv4 address (DCC sockets are AF_INET),
+    remembering the answer for peers seen before.
+    """
+    infos = socket.getaddrinfo(host, None, socket.AF_INET, socket.SOCK_STREAM)
+    *_, (address, _port) = infos[0]
+    return address
+
+
 class DCCConnection(Connection):
     """
     A DCC (Direct Client Connection).
@@ -1022,6 +1311,7 @@ class DCCConnection(Connection):
     def __init__(self, reactor, dcctype):
         super().__init__(reactor)
         self.dcctype = dcctype
+        self._recv_view = memoryview(bytearray(2**16))
 
     def connect(self, address, port):
         """Connect/reconnect to a DCC peer.
@@ -1033,11 +1323,12 @@ class DCCConnection(Connection):
 
         Returns the DCCConnection object.
         """
-        self.peeraddress = socket.gethostbyname(address)
+        self.peeraddress = _resolve(address)
         self.peerport = port
         self.buffer = buffer.LineBuffer()
         self.handlers = {}
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         try:
             self.socket.connect((self.peeraddress, self.peerport))
         except OSError as x:
@@ -1060,7 +1351,7 @@ class DCCConnection(Connection):
         self.handlers = {}
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.passive = True
-        default_addr = socket.gethostbyname(socket.gethostname()), 0
+        default_addr = _local_address(), 0
         try:
             self.socket.bind(addr or default_addr)
             self.localaddress, self.localport = self.socket.getsockname()
@@ -1076,10 +1367,9 @@ class DCCConnection(Connection):
 
             message -- Quit message.
         """
-        try:
-            del self.connected
-        except AttributeError:
+        if not self.connected:
             return
+        self.connected = False
 
         try:
             self.socket.shutdown(socket.SHUT_WR)
@@ -1088,7 +1378,7 @@ class DCCConnection(Connection):
 
         self.socket.close()
 
-        del self.socket
+        self.socket = None
         self.reactor._handle_event(
             self, Event("dcc_disconnect", self.peeraddress, "", [message])
         )
@@ -1099,6 +1389,7 @@ class DCCConnection(Connection):
 
         if self.passive and not self.connected:
             conn, (self.peeraddress, self.peerport) = self.socket.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             self.socket.close()
             self.socket = conn
             self.connected = True
@@ -1109,15 +1400,16 @@ class DCCConnection(Connection):
             return
 
         try:
-            new_data = self.socket.recv(2**14)
+            size = self.socket.recv_into(self._recv_view)
         except OSError:
             # The server hung up.
             self.disconnect("Connection reset by peer")
             return
-        if not new_data:
+        if not size:
             # Read nothing: connection must be down.
             self.disconnect("Connection reset by peer")
             return
+        new_data = self._recv_view[:size]
 
         if self.dcctype == "chat":
             self.buffer.feed(new_data)
@@ -1130,21 +1422,23 @@ class DCCConnection(Connection):
                 self.disconnect()
                 return
         else:
-            chunks = [new_data]
+            chunks = (bytes(new_data),)
 
         command = "dccmsg"
         prefix = self.peeraddress
         target = None
+        debug = log.isEnabledFor(logging.DEBUG)
         for chunk in chunks:
-            log.debug("FROM PEER: %s", chunk)
             arguments = [chunk]
-            log.debug(
-                "command: %s, source: %s, target: %s, arguments: %s",
-                command,
-                prefix,
-                target,
-                arguments,
-            )
+            if debug:
+                log.debug("FROM PEER: %s", chunk)
+                log.debug(
+                    "command: %s, source: %s, target: %s, arguments: %s",
+                    command,
+                    prefix,
+                    target,
+                    arguments,
+                )
             event = Event(command, prefix, target, arguments)
             self.reactor._handle_event(self, event)
 
@@ -1154,16 +1448,17 @@ class DCCConnection(Connection):
 
         The text will be padded with a newline if it's a DCC CHAT session.
         """
+        data = self.encode(text)
         if self.dcctype == 'chat':
-            text += '\n'
-        return self.send_bytes(self.encode(text))
+            data += b'\n'
+        return self.send_bytes(data)
 
     def send_bytes(self, bytes):
         """
         Send data to DCC peer.
         """
         try:
-            self.socket.send(bytes)
+            self.socket.sendall(bytes)
             log.debug("TO PEER: %r\n", bytes)
         except OSError:
             self.disconnect("Connection reset by peer.")
@@ -1216,14 +1511,24 @@ class SimpleIRCClient:
         """
         log.debug("_dispatcher: %s", event.type)
 
-        def do_nothing(connection, event):
-            return None
+        method = getattr(self, self._handler_name(event.type), None)
+        if method is not None:
+            method(connection, event)
 
-        method = getattr(self, "on_" + event.type, do_nothing)
-        method(connection, event)
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _handler_name(event_type):
+        """
+        The name of the method handling events of `event_type`.
+
+        >>> SimpleIRCClient._handler_name('pubmsg')
+        'on_pubmsg'
+        """
+        return sys.intern("on_" + event_type)
 
     def _dcc_disconnect(self, connection, event):
-        self.dcc_connections.remove(connection)
+        if connection in self.dcc_connections:
+            self.dcc_connections.remove(connection)
 
     def connect(self, *args, **kwargs):
         """Connect using the underlying connection"""
@@ -1274,6 +1579,8 @@ class Event:
     type: privmsg, source: @somebody, target: #channel, arguments: [], tags: []
     """
 
+    __slots__ = 'arguments', 'source', 'tags', 'target', 'type'
+
     def __init__(self, type, source, target, arguments=None, tags=None):
         """
         Initialize an Event.
@@ -1299,22 +1606,33 @@ class Event:
         self.tags = tags
 
     def __str__(self):
-        tmpl = (
-            "type: {type}, "
-            "source: {source}, "
-            "target: {target}, "
-            "arguments: {arguments}, "
-            "tags: {tags}"
+        return (
+            f"type: {self.type}, "
+            f"source: {self.source}, "
+            f"target: {self.target}, "
+            f"arguments: {self.arguments}, "
+            f"tags: {self.tags}"
         )
-        return tmpl.format(**vars(self))
 
 
 def is_channel(string):
     """Check if a string is a channel name.
 
     Returns true if the argument is a channel name, otherwise false.
+
+    >>> is_channel('#channel')
+    True
+    >>> is_channel('nick')
+    False
+    >>> is_channel('')
+    False
+    >>> is_channel(None)
+    False
     """
-    return string and string[0] in "#&+!"
+    return bool(string) and string[0] in "#&+!"
+
+
+_ip_number = struct.Struct('>L')
 
 
 def ip_numstr_to_quad(num):
@@ -1327,9 +1645,7 @@ def ip_numstr_to_quad(num):
     >>> ip_numstr_to_quad(3232235521)
     '192.168.0.1'
     """
-    packed = struct.pack('>L', int(num))
-    bytes = struct.unpack('BBBB', packed)
-    return ".".join(map(str, bytes))
+    return socket.inet_ntoa(_ip_number.pack(int(num)))
 
 
 def ip_quad_to_numstr(quad):
@@ -1339,10 +1655,25 @@ def ip_quad_to_numstr(quad):
 
     >>> ip_quad_to_numstr('192.168.0.1')
     '3232235521'
+
+    Malformed addresses, and zero-padded octets that could be read as
+    octal, are rejected.
+
+    >>> ip_quad_to_numstr('1.2.3')
+    Traceback (most recent call last):
+    ...
+    ValueError: Invalid IPv4 address: '1.2.3'
+    >>> ip_quad_to_numstr('010.0.0.1')
+    Traceback (most recent call last):
+    ...
+    ValueError: Invalid IPv4 address: '010.0.0.1'
     """
-    bytes = map(int, quad.split("."))
-    packed = struct.pack('BBBB', *bytes)
-    return str(struct.unpack('>L', packed)[0])
+    try:
+        packed = socket.inet_pton(socket.AF_INET, quad)
+    except OSError as exc:
+        raise ValueError(f"Invalid IPv4 address: {quad!r}") from exc
+    (num,) = _ip_number.unpack(packed)
+    return str(num)
 
 
 class NickMask(str):
@@ -1379,7 +1710,7 @@ class NickMask(str):
 
     @classmethod
     def from_params(cls, nick, user, host):
-        return cls('{nick}!{user}@{host}'.format(**vars()))
+        return cls(f'{nick}!{user}@{host}')
 
     @property
     def nick(self):
@@ -1393,15 +1724,18 @@ class NickMask(str):
 
     @property
     def host(self):
-        nick, sep, userhost = self.partition("!")
-        user, sep, host = userhost.partition('@')
+        user, host = self._user_host()
         return host or None
 
     @property
     def user(self):
+        user, host = self._user_host()
+        return user or None
+
+    def _user_host(self):
         nick, sep, userhost = self.partition("!")
         user, sep, host = userhost.partition('@')
-        return user or None
+        return user, host
 
     @classmethod
     def from_group(cls, group):
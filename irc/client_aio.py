@@ -200,10 +200,9 @@ class AioConnection(ServerConnection):
         Arguments:
             message -- Quit message.
         """
-        try:
-            del self.connected
-        except AttributeError:
+        if not self.connected:
             return
+        self.connected = False
 
         self.quit(message)
 
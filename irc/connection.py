@@ -45,6 +45,11 @@ class Factory:
     """
 
     family = socket.AF_INET
+    nodelay = True
+    """
+    Disable Nagle's algorithm, so that short command lines are sent
+    right away instead of waiting to be coalesced with later ones.
+    """
 
     def __init__(self, bind_address=None, wrapper=identity, ipv6=False):
         self.bind_address = bind_address
@@ -53,7 +58,10 @@ class Factory:
             self.family = socket.AF_INET6
 
     def connect(self, server_address):
-        sock = self.wrapper(socket.socket(self.family, socket.SOCK_STREAM))
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        if self.nodelay:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock = self.wrapper(sock)
         self.bind_address and sock.bind(self.bind_address)
         sock.connect(server_address)
         return sock
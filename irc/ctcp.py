@@ -3,6 +3,7 @@ Handle Client-to-Client protocol per the `best available
 spec <http://www.irchelp.org/irchelp/rfc/ctcpspec.html>`_.
 """
 
+import itertools
 import re
 
 LOW_LEVEL_QUOTE = '\x10'
@@ -23,7 +24,7 @@ def _low_level_replace(match_obj):
 
 
 def dequote(message):
-    """
+    r"""
     Dequote a message according to CTCP specifications.
 
     The function returns a list where each element can be either a
@@ -35,10 +36,20 @@ def dequote(message):
     Arguments:
 
         message -- The message to be decoded.
+
+    >>> dequote('hello')
+    ['hello']
+    >>> dequote('\x01ACTION waves\x01')
+    [('ACTION', 'waves')]
+    >>> dequote('one\x10ntwo')
+    ['one\ntwo']
+    >>> dequote('hi \x01VERSION\x01 there \x01PING 1\x01\x01')
+    ['hi ', ('VERSION',), ' there ', ('PING', '1'), '\x01']
     """
 
-    # Perform the substitution
-    message = low_level_regexp.sub(_low_level_replace, message)
+    # Perform the substitution; most messages have nothing to replace
+    if LOW_LEVEL_QUOTE in message:
+        message = low_level_regexp.sub(_low_level_replace, message)
 
     if DELIMITER not in message:
         return [message]
@@ -50,17 +61,20 @@ def dequote(message):
 
 
 def _gen_messages(chunks):
-    i = 0
-    while i < len(chunks) - 1:
+    # Chunks alternate between plain text and CTCP tagged data; the
+    # last chunk is handled below.
+    last = len(chunks) - 1
+    texts = chunks[0:last:2]
+    tagged = chunks[1:last:2]
+    for text, tag in itertools.zip_longest(texts, tagged):
         # Add message if it's non-empty.
-        if len(chunks[i]) > 0:
-            yield chunks[i]
+        if text:
+            yield text
 
-        if i < len(chunks) - 2:
+        if tag is not None:
             # Aye!  CTCP tagged data ahead!
-            yield tuple(chunks[i + 1].split(" ", 1))
-
-        i = i + 2
+            name, sep, data = tag.partition(" ")
+            yield (name, data) if sep else (name,)
 
     if len(chunks) % 2 == 0:
         # Hey, a lonely _CTCP_DELIMITER at the end!  This means
@@ -35,6 +35,11 @@ class Command(str):
         >>> Command.lookup('yourhost').code
         '002'
 
+        Known commands resolve to a shared instance, however they are
+        spelled.
+        >>> Command.lookup('PRIVMSG') is Command.lookup('privmsg')
+        True
+
         If a command is supplied that's an unrecognized name or code,
         a Command object is still returned.
         >>> fallback = Command.lookup('Unknown-command')
@@ -52,8 +57,11 @@ class Command(str):
         >>> int(fallback)
         999
         """
-        fallback = Command(raw.lower(), raw.lower())
-        return numeric.get(raw, _by_name.get(raw.lower(), fallback))
+        command = _lookup.get(raw)
+        if command is None:
+            name = raw.lower()
+            command = _by_name.get(name) or Command(name, name)
+        return command
 
 
 _codes = itertools.starmap(
@@ -101,3 +109,16 @@ protocol = [
 ]
 
 all = generated + protocol + list(numeric.values())
+
+for name in protocol:
+    _by_name.setdefault(name, Command(name, name))
+
+_lookup = {
+    **numeric,
+    **_by_name,
+    **{name.upper(): command for name, command in _by_name.items()},
+}
+"""
+Commands by the exact text seen on the wire, so the usual numeric or
+upper-case command resolves to a shared instance in one step.
+"""
@@ -40,8 +40,9 @@ class FeatureSet:
 
     def load(self, arguments):
         "Load the values from the a ServerConnection arguments"
-        features = arguments[1:-1]
-        list(map(self.load_feature, features))
+        # skip the target nick and the trailing "are supported" text
+        for feature in arguments[1:-1]:
+            self.load_feature(feature)
 
     def load_feature(self, feature):
         # negating
@@ -1,4 +1,5 @@
 import abc
+import heapq
 
 from tempora import schedule
 
@@ -22,6 +23,38 @@ class IScheduler(metaclass=abc.ABCMeta):
 
 
 class DefaultScheduler(schedule.InvokeScheduler, IScheduler):
+    """
+    Keeps ``queue`` as a heap rather than a sorted list, so adding
+    and retiring commands are O(log n) instead of O(n).
+    """
+
+    def add(self, command):
+        heapq.heappush(self.queue, command)
+
+    def run_pending(self):
+        due = self._pop_due()
+        for index, command in enumerate(due):
+            try:
+                self.run(command)
+            except BaseException:
+                # Like the base scheduler, leave the failed command and
+                # those not yet run queued for the next pass.
+                for pending in due[index:]:
+                    self.add(pending)
+                raise
+            if isinstance(command, schedule.PeriodicCommand):
+                self.add(command.next())
+
+    def _pop_due(self):
+        """
+        Remove the commands that are due from the queue before any of
+        them is run, so that commands they add wait for the next pass.
+        """
+        due = []
+        while self.queue and self.queue[0].due():
+            due.append(heapq.heappop(self.queue))
+        return due
+
     def execute_every(self, period, func):
         """
         Executes `func` every `period`.
@@ -272,7 +272,7 @@ class IRCClient(socketserver.BaseRequestHandler):
         Handle the JOINing of a user to a channel. Valid channel names start
         with a # and consist of a-z, A-Z, 0-9 and/or '_'.
         """
-        channel_names = params.split(' ', 1)[0]  # Ignore keys
+        channel_names, _, _ = params.partition(' ')  # Ignore keys
         for channel_name in channel_names.split(','):
             r_channel_name = channel_name.strip()
 
@@ -1,8 +1,12 @@
+import socket
+import threading
+import time
 from unittest import mock
 
 import pytest
 
 import irc.client
+import irc.connection
 
 
 def test_version():
@@ -11,13 +15,74 @@ def test_version():
 
 @mock.patch('irc.connection.socket')
 def test_privmsg_sends_msg(socket_mod):
+    # make sure the mock object doesn't have a write method or it will treat
+    #  it as an SSL connection and never call .sendall.
+    del socket_mod.socket.return_value.write
     server = irc.client.Reactor().server()
     server.connect('foo', 6667, 'bestnick')
-    # make sure the mock object doesn't have a write method or it will treat
-    #  it as an SSL connection and never call .send.
-    del server.socket.write
     server.privmsg('#best-channel', 'You are great')
-    server.socket.send.assert_called_with(b'PRIVMSG #best-channel :You are great\r\n')
+    server.socket.sendall.assert_called_with(
+        b'PRIVMSG #best-channel :You are great\r\n'
+    )
+
+
+@mock.patch('irc.connection.socket')
+def test_privmsg_many_splits_long_target_lists(socket_mod):
+    del socket_mod.socket.return_value.write
+    server = irc.client.Reactor().server()
+    server.connect('foo', 6667, 'bestnick')
+    send = server.socket.sendall
+    send.reset_mock()
+    targets = [f'#channel{n:03}' for n in range(100)]
+    server.privmsg_many(targets, 'hello')
+    lines = [call.args[0] for call in send.call_args_list]
+    assert len(lines) == 3
+    assert all(len(line) <= 512 for line in lines)
+    sent = ','.join(line.split()[1].decode() for line in lines)
+    assert sent.split(',') == targets
+
+    send.reset_mock()
+    server.privmsg_many(['one', 'two'], 'hello')
+    send.assert_called_once_with(b'PRIVMSG one,two :hello\r\n')
+
+    # nothing is sent if any target can't fit
+    send.reset_mock()
+    with pytest.raises(irc.client.MessageTooLong):
+        server.privmsg_many([*targets, 'x' * 500], 'hello')
+    send.assert_not_called()
+
+
+@mock.patch('irc.connection.socket')
+def test_ctcp_without_parameter(socket_mod):
+    del socket_mod.socket.return_value.write
+    server = irc.client.Reactor().server()
+    server.connect('foo', 6667, 'bestnick')
+    server.ctcp('version', 'othernick')
+    server.socket.sendall.assert_called_with(b'PRIVMSG othernick :\x01VERSION\x01\r\n')
+
+
+def test_connect_disables_nagle():
+    listener = socket.create_server(('localhost', 0))
+    sock = irc.connection.Factory()(listener.getsockname())
+    try:
+        assert sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+    finally:
+        sock.close()
+        listener.close()
+
+
+@mock.patch('irc.connection.socket')
+def test_topic(socket_mod):
+    del socket_mod.socket.return_value.write
+    server = irc.client.Reactor().server()
+    server.connect('foo', 6667, 'bestnick')
+    send = server.socket.sendall
+    server.topic('#chan')
+    send.assert_called_with(b'TOPIC #chan\r\n')
+    server.topic('#chan', 'new topic')
+    send.assert_called_with(b'TOPIC #chan :new topic\r\n')
+    server.topic('#chan', '')
+    send.assert_called_with(b'TOPIC #chan :\r\n')
 
 
 @mock.patch('irc.connection.socket')
@@ -38,6 +103,64 @@ class TestHandlers:
         assert not handler1 < handler2
         assert not handler2 < handler1
 
+    def test_handlers_called_in_priority_order(self):
+        reactor = irc.client.Reactor()
+        calls = []
+
+        def handler(name):
+            return lambda connection, event: calls.append(name)
+
+        reactor.add_global_handler('privmsg', handler('late'), 10)
+        reactor.add_global_handler('all_events', handler('all'), 0)
+        reactor.add_global_handler('privmsg', handler('early'), -10)
+        event = irc.client.Event('privmsg', 'nick!user@host', '#chan', ['hi'])
+        reactor._handle_event(None, event)
+        assert calls == ['early', 'all', 'late']
+
+        # changes to the handlers are seen by subsequent events
+        calls.clear()
+        reactor.add_global_handler('privmsg', handler('first'), -20)
+        reactor._handle_event(None, event)
+        assert calls == ['first', 'early', 'all', 'late']
+
+    def test_handler_added_during_dispatch(self):
+        """
+        A handler registered while an event is being dispatched takes
+        effect for the next event, not the current one.
+        """
+        reactor = irc.client.Reactor()
+        calls = []
+
+        def late(connection, event):
+            calls.append('late')
+
+        def register(connection, event):
+            calls.append('register')
+            reactor.add_global_handler('privmsg', late, 10)
+
+        reactor.add_global_handler('privmsg', register)
+        event = irc.client.Event('privmsg', 'nick!user@host', '#chan', ['hi'])
+        reactor._handle_event(None, event)
+        assert calls == ['register']
+        reactor._handle_event(None, event)
+        assert calls == ['register', 'register', 'late']
+
+    def test_remove_global_handler(self):
+        reactor = irc.client.Reactor()
+
+        def handler(connection, event):
+            pass
+
+        def other(connection, event):
+            pass
+
+        reactor.add_global_handler('privmsg', handler)
+        reactor.add_global_handler('privmsg', handler, 5)
+        reactor.add_global_handler('privmsg', other)
+        assert reactor.remove_global_handler('privmsg', handler) == 1
+        assert [h.callback for h in reactor.handlers['privmsg']] == [other]
+        assert reactor.remove_global_handler('join', handler) == 0
+
 
 @mock.patch('irc.connection.socket')
 def test_command_without_arguments(self):
@@ -45,3 +168,292 @@ def test_command_without_arguments(self):
     server = irc.client.Reactor().server()
     server.connect('foo', 6667, 'bestnick')
     server._process_line('GLOBALUSERSTATE')
+
+
+@mock.patch('irc.connection.socket')
+def test_tracks_own_nickname(socket_mod):
+    server = irc.client.Reactor().server()
+    server.connect('foo', 6667, 'bestnick')
+    server._process_line(':irc.example.com 001 bestnick_ :Welcome')
+    assert server.get_nickname() == 'bestnick_'
+    server._process_line(':bestnick_!user@host NICK :othernick')
+    assert server.get_nickname() == 'othernick'
+    server._process_line(':someone!user@host NICK :thirdnick')
+    assert server.get_nickname() == 'othernick'
+
+
+@mock.patch('irc.connection.socket')
+def test_raw_messages_only_when_wanted(socket_mod):
+    reactor = irc.client.Reactor()
+    server = reactor.server()
+    server.connect('foo', 6667, 'bestnick')
+    seen = []
+    reactor._handle_event = lambda conn, event: seen.append(event.type)
+    server._process_line(':nick!user@host PRIVMSG #chan :hi')
+    assert seen == ['pubmsg']
+
+    seen.clear()
+    server.add_global_handler('all_raw_messages', lambda conn, event: None)
+    server._process_line(':nick!user@host PRIVMSG #chan :hi')
+    assert seen == ['all_raw_messages', 'pubmsg']
+
+
+@mock.patch('irc.connection.socket')
+def test_disconnect_twice(socket_mod):
+    "A second disconnect should be a no-op"
+    server = irc.client.Reactor().server()
+    server.connect('foo', 6667, 'bestnick')
+    sock = server.socket
+    server.disconnect()
+    server.disconnect()
+    assert server.socket is None
+    assert not server.is_connected()
+    sock.close.assert_called_once_with()
+
+
+def test_reactor_subclass_without_super_init():
+    class Custom(irc.client.Reactor):
+        def __init__(self):
+            self.scheduler = self.scheduler_class()
+            self.connections = []
+            self.handlers = {}
+            self.mutex = threading.RLock()
+            self._on_connect = self._on_disconnect = lambda sock: None
+
+    reactor = Custom()
+    calls = []
+    reactor.add_global_handler('privmsg', lambda c, e: calls.append(e.type))
+    reactor._handle_event(None, irc.client.Event('privmsg', None, None))
+    assert calls == ['privmsg']
+
+    conn = reactor.server()
+    conn.socket, peer = socket.socketpair()
+    conn.process_data = mock.Mock()
+    peer.send(b'PING :server\r\n')
+    reactor.process_once(timeout=1)
+    conn.process_data.assert_called_once_with()
+    conn.socket.close()
+    peer.close()
+
+
+def test_process_once_dispatches_readable_sockets():
+    reactor = irc.client.Reactor()
+    conn = reactor.server()
+    conn.socket, peer = socket.socketpair()
+    conn.process_data = mock.Mock()
+    peer.send(b'PING :server\r\n')
+    reactor.process_once(timeout=1)
+    conn.process_data.assert_called_once_with()
+
+    # a connection that went away is dropped from the selector
+    conn.socket.close()
+    conn.socket = None
+    reactor.process_once()
+    assert not reactor._selector.get_map()
+    peer.close()
+
+
+def test_write_buffer_coalesces_sends():
+    reactor = irc.client.Reactor()
+    conn = reactor.server()
+    sock, peer = socket.socketpair()
+    conn.set_write_buffer()
+    conn.connect('foo', 6667, 'bestnick', connect_factory=lambda addr: sock)
+    conn.privmsg('#chan', 'one')
+    conn.privmsg('#chan', 'two')
+    peer.setblocking(False)
+    with pytest.raises(BlockingIOError):
+        peer.recv(1024)
+
+    reactor.process_once(timeout=1)
+    peer.setblocking(True)
+    assert peer.recv(1024) == (
+        b'NICK bestnick\r\n'
+        b'USER bestnick 0 * :bestnick\r\n'
+        b'PRIVMSG #chan :one\r\n'
+        b'PRIVMSG #chan :two\r\n'
+    )
+    assert not conn._write_buf
+
+    conn.privmsg('#chan', 'three')
+    conn.flush()
+    assert peer.recv(1024) == b'PRIVMSG #chan :three\r\n'
+
+    # queued output is not lost on disconnect
+    conn.quit('bye')
+    conn.disconnect()
+    assert peer.recv(1024) == b'QUIT :bye\r\nQUIT\r\n'
+    peer.close()
+
+
+def test_write_buffer_accepts_sends_from_other_threads():
+    reactor = irc.client.Reactor()
+    conn = reactor.server()
+    sock, peer = socket.socketpair()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+    conn.set_write_buffer()
+    conn.connect('foo', 6667, 'bestnick', connect_factory=lambda addr: sock)
+    count = 20000
+    received = bytearray()
+    errors = []
+    done = threading.Event()
+
+    def produce():
+        try:
+            for n in range(count):
+                conn.privmsg('#chan', f'message {n}')
+        except BufferError as exc:
+            errors.append(exc)
+
+    def consume():
+        # read slowly, so that the reactor blocks in send while the
+        # producer keeps queuing
+        peer.settimeout(0.1)
+        while not done.is_set():
+            try:
+                received.extend(peer.recv(1024))
+            except socket.timeout:
+                continue
+            time.sleep(0.0005)
+
+    threads = [threading.Thread(target=produce), threading.Thread(target=consume)]
+    for thread in threads:
+        thread.start()
+    while received.count(b'\n') < count + 2 and not errors:
+        reactor.process_once(timeout=0.01)
+    done.set()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    lines = bytes(received).split(b'\r\n')[2:-1]
+    assert lines == [f'PRIVMSG #chan :message {n}'.encode() for n in range(count)]
+    conn.disconnect()
+    peer.close()
+
+
+def test_write_buffer_flushes_at_limit():
+    conn = irc.client.Reactor().server()
+    sock, peer = socket.socketpair()
+    conn.connect('foo', 6667, 'bestnick', connect_factory=lambda addr: sock)
+    peer.recv(1024)
+    conn.set_write_buffer(limit=40)
+    conn.privmsg('#chan', 'one')
+    assert conn._write_buf == b'PRIVMSG #chan :one\r\n'
+    conn.privmsg('#chan', 'two')
+    assert not conn._write_buf
+    assert peer.recv(1024) == b'PRIVMSG #chan :one\r\nPRIVMSG #chan :two\r\n'
+    conn.disconnect()
+    peer.close()
+
+
+def test_process_data_reassembles_lines():
+    reactor = irc.client.Reactor()
+    conn = reactor.server()
+    sock, peer = socket.socketpair()
+    conn.connect('foo', 6667, 'bestnick', connect_factory=lambda addr: sock)
+    received = []
+    conn.add_global_handler('privmsg', lambda c, e: received.append(e.arguments))
+    peer.sendall(b':nick!user@host PRIVMSG bestnick :one\r\n:nick!user@host PRIV')
+    conn.process_data()
+    peer.sendall(b'MSG bestnick :two\r\n')
+    conn.process_data()
+    assert received == [['one'], ['two']]
+
+    peer.close()
+    conn.process_data()
+    assert not conn.is_connected()
+
+
+class TestRateLimit:
+    @pytest.fixture
+    def clock(self, monkeypatch):
+        clock = mock.Mock(now=1000.0, sleeps=[])
+
+        def sleep(seconds):
+            clock.sleeps.append(seconds)
+            clock.now += seconds
+
+        monkeypatch.setattr(irc.client.time, 'monotonic', lambda: clock.now)
+        monkeypatch.setattr(irc.client.time, 'sleep', sleep)
+        return clock
+
+    def test_burst_then_limit(self, clock):
+        calls = []
+        send = irc.client._TokenBucket(calls.append, max_rate=2, burst=3)
+        for n in range(4):
+            send(n)
+        assert calls == [0, 1, 2, 3]
+        assert clock.sleeps == [0.5]
+
+    def test_write_buffer_keeps_rate(self, clock):
+        conn = irc.client.Reactor().server()
+        sock, peer = socket.socketpair()
+        conn.connect('foo', 6667, 'bestnick', connect_factory=lambda addr: sock)
+        peer.recv(1024)
+        conn.set_write_buffer()
+        conn.set_rate_limit(5)
+        conn.privmsg('#chan', 'one')
+        assert peer.recv(1024) == b'PRIVMSG #chan :one\r\n'
+        conn.privmsg('#chan', 'two')
+        assert peer.recv(1024) == b'PRIVMSG #chan :two\r\n'
+        assert clock.sleeps == [0.2]
+        conn.disconnect()
+        peer.close()
+
+    def test_credit_earned_while_idle(self, clock):
+        send = irc.client._TokenBucket(lambda: None, max_rate=2, burst=3)
+        send()
+        send()
+        send()
+        clock.now += 1
+        send()
+        send()
+        assert clock.sleeps == []
+
+
+def test_dcc_chat_round_trip():
+    reactor = irc.client.Reactor()
+    listener = reactor.dcc().listen(('127.0.0.1', 0))
+    client = reactor.dcc().connect('127.0.0.1', listener.localport)
+    received = []
+    reactor.add_global_handler('dccmsg', lambda c, e: received.append(e.arguments))
+    reactor.process_once(timeout=1)
+    assert listener.connected
+    assert client.socket.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+    assert listener.socket.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+
+    client.privmsg('hello')
+    reactor.process_once(timeout=1)
+    assert received == [[b'hello']]
+    client.disconnect()
+    listener.disconnect()
+
+
+def test_dcc_raw_delivers_bytes():
+    reactor = irc.client.Reactor()
+    listener = reactor.dcc('raw').listen(('127.0.0.1', 0))
+    client = reactor.dcc('raw').connect('127.0.0.1', listener.localport)
+    received = []
+    reactor.add_global_handler('dccmsg', lambda c, e: received.append(e.arguments))
+    reactor.process_once(timeout=1)
+    client.send_bytes(b'no\nline breaks here')
+    reactor.process_once(timeout=1)
+    assert received == [[b'no\nline breaks here']]
+    assert type(received[0][0]) is bytes
+    client.disconnect()
+    listener.disconnect()
+
+
+def test_simple_client_forgets_disconnected_dcc():
+    client = irc.client.SimpleIRCClient()
+    listener = client.dcc('chat').listen(('127.0.0.1', 0))
+    peer = client.dcc('chat').connect('127.0.0.1', listener.localport)
+    assert client.dcc_connections == [listener, peer]
+    peer.disconnect()
+    assert client.dcc_connections == [listener]
+
+    # a connection made on the reactor directly is not tracked
+    other = client.reactor.dcc('chat').connect('127.0.0.1', listener.localport)
+    other.disconnect()
+    assert client.dcc_connections == [listener]
+    listener.socket.close()
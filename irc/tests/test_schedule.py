@@ -0,0 +1,69 @@
+import datetime
+import heapq
+
+import pytest
+import tempora.schedule
+
+from irc import schedule
+
+
+def test_runs_due_commands_in_order():
+    scheduler = schedule.DefaultScheduler()
+    calls = []
+    for delay in (3, -1, 60, -2, 0):
+        scheduler.execute_after(delay, lambda delay=delay: calls.append(delay))
+    assert scheduler.queue[0].delay == datetime.timedelta(seconds=-2)
+    scheduler.run_pending()
+    assert calls == [-2, -1, 0]
+    assert len(scheduler.queue) == 2
+
+
+def test_periodic_command_is_rescheduled():
+    scheduler = schedule.DefaultScheduler()
+    calls = []
+    overdue = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(1)
+    command = tempora.schedule.PeriodicCommand.from_datetime(overdue)
+    command.delay = datetime.timedelta(days=2)
+    command.target = lambda: calls.append(None)
+    scheduler.add(command)
+    scheduler.run_pending()
+    assert len(calls) == 1
+    assert len(scheduler.queue) == 1
+    assert not scheduler.queue[0].due()
+
+
+def test_commands_added_while_running_wait_for_next_pass():
+    scheduler = schedule.DefaultScheduler()
+    calls = []
+
+    def reschedule():
+        calls.append(None)
+        scheduler.execute_after(0, reschedule)
+
+    scheduler.execute_after(0, reschedule)
+    scheduler.run_pending()
+    assert len(calls) == 1
+    scheduler.run_pending()
+    assert len(calls) == 2
+
+
+def test_failing_command_keeps_the_rest_queued():
+    scheduler = schedule.DefaultScheduler()
+    calls = []
+
+    def fail():
+        calls.append('fail')
+        raise RuntimeError
+
+    scheduler.execute_after(-2, fail)
+    scheduler.execute_after(-1, lambda: calls.append('ok'))
+    with pytest.raises(RuntimeError):
+        scheduler.run_pending()
+    assert calls == ['fail']
+    assert len(scheduler.queue) == 2
+
+    scheduler.queue.remove(next(c for c in scheduler.queue if c.target is fail))
+    heapq.heapify(scheduler.queue)
+    scheduler.run_pending()
+    assert calls == ['fail', 'ok']
+    assert not scheduler.queue